@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import time
 
-from datetime import datetime
+from queue import SimpleQueue
 
 from colored import attr, fg
 
@@ -17,25 +18,28 @@ class MqttClient:
         2: 'E',  # exactly once
     }
 
-    def __init__(self, client_id, host='localhost', port=1883):
+    def __init__(self, client_id, host='localhost', port=1883, log=False,
+                 keepalive=120):
         self.client_id = client_id
         self.host = host
         self.port = port
+        self.keepalive = keepalive
         self.client = mqtt.Client(client_id=self.client_id)
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
-        self.client.on_log = self.on_log
-        self.client.on_message = self.on_message
-        self.client.on_publish = self.on_publish
-        self.client.on_subscribe = self.on_subscribe
-        self.client.on_subscribe = self.on_subscribe
-        self.client.on_unsubscribe = self.on_unsubscribe
+        # paho calls these for every packet, so only set them when a
+        # subclass actually implements them
+        for name in ('on_message', 'on_publish', 'on_subscribe',
+                     'on_unsubscribe'):
+            if getattr(type(self), name) is not getattr(MqttClient, name):
+                setattr(self.client, name, getattr(self, name))
+        if log:
+            self.client.on_log = self.on_log
         self.connected = False
 
     def on_connect(self, client, userdata, flags, rc):
         if rc != 0:
-            print('Unable to connect to broker {}:{}: {}'.format(
-                self.host, self.port, rc))
+            print(f'Unable to connect to broker {self.host}:{self.port}: {rc}')
             sys.exit(64)
         self.connected = True
         pass
@@ -53,44 +57,74 @@ class MqttClient:
     def on_subscribe(self, client, userdata, mid, granted_qos):
         pass
 
-    def on_unsubscribe(client, userdata, mid):
+    def on_unsubscribe(self, client, userdata, mid):
         pass
 
-    def on_log(client, userdata, level, buf):
+    def on_log(self, client, userdata, level, buf):
         print(buf)
         pass
 
 
 class MqttMonitor(MqttClient):
+    # the terminal colors are constant, so format them only once
+    topic_color = fg('green')
+    reset = attr('reset')
+    qos_labels = {
+        q: fg('blue') + label + attr('reset')
+        for q, label in MqttClient.qos.items()}
+    retain_label = fg('blue') + 'R' + attr('reset')
+
     def __init__(self, client_id, topics=[], host='localhost', port=1883,
-                 timestamp=True):
-        super().__init__(client_id, host, port)
+                 timestamp=True, keepalive=120):
+        super().__init__(client_id, host, port, keepalive=keepalive)
         self.timestamp = timestamp
         if not isinstance(topics, list):
             raise TypeError('topcis must be a list')
         if len(topics) == 0:
             raise ValueError('must specify at least one topic')
         self.topics = topics
+        self.messages = SimpleQueue()
+        # HH:MM:SS of the last second a message was printed in
+        self.ts_second = None
+        self.ts_prefix = ''
+        self.output = sys.stdout.buffer
 
     def on_connect(self, client, userdata, flags, rc):
-        for t in self.topics:
-            client.subscribe(t)
+        client.subscribe([(t, 0) for t in self.topics])
 
     def on_message(self, client, userdata, msg):
-        if self.timestamp:
-            ts = datetime.now().strftime('%H:%M:%S.%f ')
+        # runs on the network thread; printing is left to monitor()
+        self.messages.put((time.time() if self.timestamp else None, msg))
+
+    def print_message(self, received, msg):
+        if received is not None:
+            second = int(received)
+            if second != self.ts_second:
+                self.ts_second = second
+                self.ts_prefix = time.strftime(
+                    '%H:%M:%S', time.localtime(second))
+            ts = f'{self.ts_prefix}.{int((received - second) * 1000000):06d} '
         else:
             ts = ''
-        qos = fg('blue') + self.qos[msg.qos] + attr('reset')
-        retain = (fg('blue') + 'R' + attr('reset')) if msg.retain else ''
-        print('{}{}{}{} ({}{}): {}'.format(
-            ts, fg('green'), msg.topic, attr('reset'),
-            qos, retain,
-            msg.payload.decode(),))
+        qos = self.qos_labels[msg.qos]
+        retain = self.retain_label if msg.retain else ''
+        topic = f'{self.topic_color}{msg.topic}{self.reset}'
+        header = f'{ts}{topic} ({qos}{retain}): '
+        # the payload is written as received, without decoding it
+        self.output.write(header.encode() + msg.payload + b'\n')
 
     def monitor(self):
-        self.client.connect(self.host, self.port, 5)
-        self.client.loop_forever()
+        self.client.connect(self.host, self.port, self.keepalive)
+        self.client.loop_start()
+        sys.stdout.flush()
+        try:
+            while True:
+                self.print_message(*self.messages.get())
+                # flush once the burst of messages received so far is printed
+                if self.messages.empty():
+                    self.output.flush()
+        finally:
+            self.client.loop_stop()
 
 
 class MqttPost(MqttClient):
@@ -98,33 +132,27 @@ class MqttPost(MqttClient):
     Connect to broker and post one or more messages.
     '''
 
-    def __init__(self, client_id, host='localhost', port=1883):
-        super().__init__(client_id, host, port)
-        self.complete = False
-
-    def publish_next(self):
-        if len(self.messages) == 0:
-            self.complete = True
-        else:
-            self.client.publish(self.topic, self.messages.pop(0))
-
-    def on_connect(self, client, userdata, flags, rc):
-        super().on_connect(client, userdata, flags, rc)
-        self.publish_next()
-
-    def on_publish(self, client, userdata, mid):
-        super().on_publish(client, userdata, mid)
-        self.publish_next()
+    # set once the background thread handling the network is running
+    loop_started = False
+
+    def connect(self):
+        if self.loop_started:
+            # the background thread reconnects by itself; wait for it
+            while not self.connected:
+                time.sleep(0.01)
+            return
+        self.client.connect(self.host, self.port, self.keepalive)
+        while not self.connected:
+            self.client.loop(0.01)
+        # from now on, the network is handled by a background thread
+        self.client.loop_start()
+        self.loop_started = True
 
     def post(self, topic, messages):
-        self.topic = topic
-        self.messages = messages
-        self.complete = False
         if not isinstance(messages, list):
             raise TypeError('messages must be a list')
-        if self.connected:
-            self.publish_next()
-        else:
-            self.client.connect(self.host, self.port, 5)
-        while not self.complete:
-            self.client.loop(0.01)
+        if not self.connected:
+            self.connect()
+        # hand all messages to the client at once, then wait for them to go out
+        for info in [self.client.publish(topic, m) for m in messages]:
+            info.wait_for_publish()
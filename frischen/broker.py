@@ -1,6 +1,5 @@
 import logging
 import asyncio
-import os
 from hbmqtt.broker import Broker
 
 config = {
@@ -33,15 +33,26 @@ The following code sets up a tower with some elements.
 import asyncio
 import logging
 
-from inspect import isclass
+from functools import lru_cache
+from operator import attrgetter
 
-from hbmqtt.client import MQTTClient, ClientException
-from hbmqtt.mqtt.constants import QOS_2
+from hbmqtt.client import MQTTClient
+from hbmqtt.mqtt.constants import QOS_0, QOS_2
 
 
+__all__ = [
+    'BlockEnd', 'BlockStart', 'Counter', 'DistantSignal', 'Element', 'ElementManager', 'MQTTDispatcher',
+    'OuterButton', 'PubSubTopic', 'Route', 'RouteManager', 'Signal', 'Tower', 'Track', 'Turnout',
+    'array_to_str', 'to_bool']
+
 logger = logging.getLogger(__name__)
 
 
+TRUE_VALUES = frozenset([1, True, '1', 't', 'T', 'true', 'True', 'y', 'yes'])
+
+BOOL_STRINGS = ('0', '1')
+
+
 def to_bool(v):
     """Returns :py:const:`True` if value is ``True``, or any string value
     representing true, such as ``y`` or ``true``.
@@ -49,7 +60,7 @@ def to_bool(v):
     :param v: an object to be evaluated
     :returns: boolean
     """
-    return v in [1, True, '1', 't', 'T', 'true', 'True', 'y', 'yes']
+    return v in TRUE_VALUES
 
 
 def array_to_str(ary):
@@ -62,17 +73,34 @@ def array_to_str(ary):
     :param ary: The array to be converted
     :returns: The string
     """
-    r = []
-    for i in ary:
-        if isinstance(i, bool):
-            r.append('{:b}'.format(i))
-        else:
-            r.append(str(i))
-    return ','.join(r)
+    return ','.join(BOOL_STRINGS[i] if type(i) is bool else str(i) for i in ary)
+
+
+@lru_cache(maxsize=1024)
+def _state_payload(state):
+    """Return the value string and the encoded MQTT payload for a state tuple.
+
+    Elements only ever take on a handful of states, so both are cached.
+    """
+    value = array_to_str(state)
+    return value, value.encode('utf-8')
+
+
+def _properties_getter(properties):
+    """Return a function returning the values of the properties of an element as a tuple."""
+    if len(properties) == 0:
+        return lambda element: ()
+    if len(properties) == 1:
+        getter = attrgetter(properties[0])
+        return lambda element: (getter(element),)
+    return attrgetter(*properties)
 
 
 class PubSubTopic():
     """A simple way for one object to notify others."""
+
+    __slots__ = ('subscribers',)
+
     def __init__(self):
         self.subscribers = []
 
@@ -88,17 +116,29 @@ class PubSubTopic():
 
     def publish(self, *args, **kwargs):
         """Call all registered subscribers."""
+        debug = logger.isEnabledFor(logging.DEBUG)
         for name, fn in self.subscribers:
-            logger.debug(f'post {name} {args}')
+            if debug:
+                logger.debug('post %s %s', name, args)
             fn(*args, **kwargs)
 
 
 class MQTTDispatcher():
     """Subscribe to one or more MQTT topics, and call the registered callbacks with the messages received."""
 
-    def __init__(self, client):
+    def __init__(self, client, wildcards=None):
+        """
+        :param client: The MQTTClient to receive messages from.
+        :param wildcards: (optional) A list of topic filters ending in ``#``.
+            Topics below these are not subscribed to individually.
+        """
         self.client = client
+        self.wildcards = list(wildcards or [])
         self.subscribers = {}
+        self.handlers = {}
+        """Maps each topic to the callable dispatching its messages.
+
+        For topics with a single subscriber, this is the subscriber itself."""
         self.connected = True
 
     def subscribe(self, topic, name, fn):
@@ -111,6 +151,9 @@ class MQTTDispatcher():
         """
         if topic not in self.subscribers:
             self.subscribers[topic] = PubSubTopic()
+            self.handlers[topic] = fn
+        else:
+            self.handlers[topic] = self.subscribers[topic].publish
         self.subscribers[topic].subscribe(name, fn)
 
     def dispatch_one(self, topic, value):
@@ -119,12 +162,35 @@ class MQTTDispatcher():
         :param topic: the message topic
         :param value: the message content
         """
-        if topic in self.subscribers:
-            self.subscribers[topic].publish(topic, value)
+        handler = self.handlers.get(topic)
+        if handler is not None:
+            handler(topic, value)
+
+    def dispatch_many(self, messages):
+        """Dispatch several messages, in order, to all subscribers.
+
+        :param messages: an iterable of (topic, value) tuples
+        """
+        handlers = self.handlers
+        for topic, value in messages:
+            handler = handlers.get(topic)
+            if handler is not None:
+                handler(topic, value)
+
+    def subscriptions(self):
+        """Return the topic filters to subscribe to with the broker.
+
+        These are the wildcards, plus all topics not covered by one of them.
+
+        :return: list of topic filters
+        """
+        prefixes = tuple(w[:-1] for w in self.wildcards)
+        return self.wildcards + [t for t in self.subscribers.keys() if not t.startswith(prefixes)]
 
     async def dispatch(self):
         """Receive and dispatch messages until told to stop."""
-        await self.client.subscribe([(t, QOS_2) for t in self.subscribers.keys()])
+        subscriptions = self.subscriptions()
+        await self.client.subscribe([(t, QOS_2) for t in subscriptions])
 
         while self.connected:
             message = await self.client.deliver_message()
@@ -133,7 +199,7 @@ class MQTTDispatcher():
             value = packet.payload.data.decode()
             self.dispatch_one(topic, value)
 
-        await self.client.unsubscribe(self.subscribers.keys())
+        await self.client.unsubscribe(subscriptions)
 
 
 class ElementManager():
@@ -141,6 +207,8 @@ class ElementManager():
 
     def __init__(self):
         self.objects = {}
+        self.pushed = set()
+        """The set of elements whose button is currently pushed."""
 
     def all(self):
         """Return all registered elements."""
@@ -159,7 +227,7 @@ class ElementManager():
         """
         if isinstance(name, str):
             return self.objects.get(name)
-        if name in self.objects.values():
+        if self.objects.get(getattr(name, 'name', None)) is name:
             return name
         return None
 
@@ -174,6 +242,9 @@ class ElementManager():
         """Register an element with this manager.
 
         :param element: The element to be registered."""
+        previous = self.objects.get(element.name)
+        if previous is not None:
+            self.pushed.discard(previous)
         self.objects[element.name] = element
 
     def reset_all(self):
@@ -191,10 +262,11 @@ class ElementManager():
         The element to be removed can be specified by the object or its name.
         :param element: the element to be unregistered.
         """
-        if element in self.objects:
-            del self.objects[element]
-        if 'name' in element:
+        if isinstance(element, str):
+            element = self.objects.get(element)
+        if element is not None and self.objects.get(element.name) is element:
             del self.objects[element.name]
+            self.pushed.discard(element)
 
 
 class Element():
@@ -206,9 +278,26 @@ class Element():
     This is an abstract base class.
     """
 
+    __slots__ = (
+        'kind', 'name', 'tower', '_topic', '_pushed', 'task', 'on_update', 'occupied', '_published')
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
+    properties = ('occupied',)
+    """The names of the properties making up the state of this element.
+
+    The properties are published in this order. Subclasses override this
+    class attribute."""
+
+    _property_set = frozenset(properties)
+    _getter = staticmethod(_properties_getter(properties))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._property_set = frozenset(cls.properties)
+        cls._getter = staticmethod(_properties_getter(cls.properties))
+
     def __init__(self, tower, name):
         """
         :param tower: The :py:class:`Tower` this element is part of.
@@ -219,10 +308,12 @@ class Element():
         self.name = name
         self.objects.register(self)
         self.tower = tower
+        self._topic = self.tower.panel_topic(self.kind, self.name)
         self.pushed = False
+        self.occupied = False
         self.task = None
-        self.properties = ['occupied']
         self.on_update = PubSubTopic()
+        self._published = None
         self.tower.dispatcher.subscribe(self.tower.panel_topic('button', self.name), str(self), self.on_button)
         self.tower.dispatcher.subscribe(self.tower.trackside_topic('track', name), str(self), self.on_occupied)
 
@@ -230,6 +321,23 @@ class Element():
         """Returns a string representation of this object."""
         return f'{self.__class__.__name__}<{self.name}>'
 
+    @property
+    def pushed(self):
+        """``True`` while the signalman is pushing the button of this element.
+
+        The element manager keeps track of all pushed elements, see
+        :py:attr:`ElementManager.pushed`.
+        """
+        return self._pushed
+
+    @pushed.setter
+    def pushed(self, value):
+        self._pushed = value
+        if value:
+            self.objects.pushed.add(self)
+        else:
+            self.objects.pushed.discard(self)
+
     def on_button(self, topic, value):
         """The signalman has pushed the button.
 
@@ -250,13 +358,22 @@ class Element():
         self.update(occupied=to_bool(value))
 
     def publish(self):
-        """Publish this elements state to the panel."""
-        self.tower.publish(self.topic(), self.value.encode('utf-8'))
-        self.on_update.publish(self.value)
+        """Publish this elements state to the panel.
+
+        Nothing is published if the state is the same as the one published
+        last.
+        """
+        value, payload = _state_payload(self._getter(self))
+        if value == self._published:
+            return
+        self._published = value
+        self.tower.publish(self._topic, payload)
+        self.on_update.publish(value)
 
     def reset(self):
         """Reset element to initial state and publish."""
         self.occupied = False
+        self._published = None
         self.publish()
 
     def topic(self):
@@ -264,25 +381,30 @@ class Element():
 
         :return: topic as string.
         """
-        return self.tower.panel_topic(self.kind, self.name)
+        return self._topic
 
     def update(self, **kwargs):
         """Update this elements properties.
 
         After updating the properties, publish the new state to the panel.
+        If none of the properties has changed, nothing is published.
 
         :param kwargs: you can specify one or more properties as named
             parameters.
         """
+        changed = False
         for k, v in kwargs.items():
-            if k not in self.properties:
+            if k not in self._property_set:
                 raise KeyError(f'property "{k}" is not valid for {self.__class__.__name__}')
-            self.__dict__[k] = v
-        self.publish()
+            if getattr(self, k) != v:
+                setattr(self, k, v)
+                changed = True
+        if changed:
+            self.publish()
 
     @property
     def value(self):
-        return array_to_str([self.__dict__[k] for k in self.properties])
+        return array_to_str(self._getter(self))
 
 
 class BlockEnd(Element):
@@ -297,6 +419,10 @@ class BlockEnd(Element):
 
     """
 
+    __slots__ = ('blocked', 'clearance_lock')
+
+    properties = Element.properties + ('blocked', 'clearance_lock')
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -313,7 +439,6 @@ class BlockEnd(Element):
             the train has left the block.
         """
         super().__init__(tower, name)
-        self.properties += ('blocked', 'clearance_lock')
         self.blocked = False
         self.clearance_lock = True
         if not '/' in blockstart_topic:
@@ -379,6 +504,10 @@ class BlockStart(Element):
     unlocked when the remote blockend unlocks it.
     """
 
+    __slots__ = ('blocked',)
+
+    properties = Element.properties + ('blocked',)
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -396,7 +525,6 @@ class BlockStart(Element):
             contact or other mechanism that locks the block.
         """
         super().__init__(tower, name)
-        self.properties += ('blocked',)
         self.blocked = False
         if not '/' in blockend_topic:
             blockend_topic = self.tower.trackside_topic('block', blockend_topic)
@@ -433,6 +561,10 @@ class BlockStart(Element):
 class Counter(Element):
     """Counts substitute procedure operations on the panel."""
 
+    __slots__ = ('count',)
+
+    properties = ('count',)
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -445,7 +577,6 @@ class Counter(Element):
         """
         super().__init__(tower, name)
         self.count = 0
-        self.properties = ['count']
         if button is None:
             button = OuterButton.objects.get(name)
         if button is None:
@@ -503,6 +634,10 @@ class DistantSignal(Element):
     diverging.
     """
 
+    __slots__ = ('mounted_at', 'aspect')
+
+    properties = ('aspect',)
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -520,9 +655,9 @@ class DistantSignal(Element):
             the home signal.
         """
         super().__init__(tower, name)
+        self._topic = self.tower.panel_topic('signal', self.name)
         self.mounted_at = None
         self.aspect = 'Vr0'
-        self.properties = ['aspect']
         if mounted_at is not None:
             self.mounted_at = Signal.objects.get(mounted_at)
             self.mounted_at.on_update.subscribe('mounted_at', self.mounted_at_changed)
@@ -542,17 +677,11 @@ class DistantSignal(Element):
                 lambda aspect:
                 self.start_distant(aspect) if turnout.position==1 else False)
 
-    def topic(self):
-        """Returns the full panel topic for this element.
-
-        :return: topic as string.
-        """
-        return self.tower.panel_topic('signal', self.name)
-
     def publish(self):
         """Publishes this signals aspect to the panel."""
         if self.mounted_at is not None and self.mounted_at.value == 'Hp0':
-            self.tower.publish(self.topic(), '-'.encode('utf-8'))
+            self._published = None
+            self.tower.publish(self._topic, b'-')
         else:
             super().publish()
 
@@ -588,9 +717,20 @@ class Signal(Element):
     :ivar alt_timeout: time in seconds the alternate aspect will be shown.
     """
 
+    __slots__ = ('alt_delay', 'aspect', 'aspects')
+
+    properties = ('aspect',)
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
+    outer_button_actions = {
+        'SGT': 'start_change_shunting',
+        'HaGT': 'start_halt',
+        'ErsGT': 'start_alt',
+    }
+    """Maps outer buttons to the method called when pushed together with the signal button."""
+
     def __init__(self, tower, name):
         """
         :param tower: The :py:class:`Tower` this element is part of.
@@ -600,7 +740,6 @@ class Signal(Element):
         super().__init__(tower, name)
         self.alt_delay = 15
         self.aspect = 'Hp0'
-        self.properties = ['aspect']
         self.aspects = []
 
     def on_button(self, topic, value):
@@ -626,27 +765,19 @@ class Signal(Element):
         """
         super().on_button(topic, value)
         if self.pushed:
-            if self.tower.is_outer_button('SGT'):
-                self.start_change_shunting()
-                return
-            if self.tower.is_outer_button('HaGT'):
-                self.start_halt()
-                return
-            if self.tower.is_outer_button('ErsGT'):
-                self.start_alt()
-                return
+            for button, action in self.outer_button_actions.items():
+                if self.tower.is_outer_button(button):
+                    getattr(self, action)()
+                    return
             if self.tower.is_outer_button('FHT'):
-                for route in Route.objects.all():
-                    if route.s1 == self and route.locked:
+                for route in Route.objects.find_by_start(self):
+                    if route.locked:
                         Counter.objects.get('FHT').increment()
                         route.unlock()
                         return
                 return
 
-            pushed = []
-            for e in self.objects.all():
-                if e.pushed:
-                    pushed.append(e)
+            pushed = self.objects.pushed
             if len(pushed) == 2:
                 route = Route.objects.find_by_signals(pushed)
                 if route:
@@ -682,7 +813,7 @@ class Signal(Element):
             self.task = asyncio.create_task(self.change_alt())
             Counter.objects.get('ErsGT').increment()
         else:
-            logger.debug(f'Not activating Zs1: {self.value}')
+            logger.debug('Not activating Zs1: %s', self.value)
 
     async def change_alt(self):
         """Change to alt aspect, then return to stop aspect."""
@@ -711,6 +842,10 @@ class Signal(Element):
 class Track(Element):
     """Manages a segment of track."""
 
+    __slots__ = ('locked',)
+
+    properties = Element.properties + ('locked',)
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -722,7 +857,6 @@ class Track(Element):
         """
         super().__init__(tower, name)
         self.locked = False
-        self.properties += ['locked']
 
 
 class Turnout(Element):
@@ -735,6 +869,10 @@ class Turnout(Element):
     :ivar blocked: ``True`` if the turnout has been locked individually.
     """
 
+    __slots__ = ('position', 'moving', 'locked', 'blocked', 'moving_delay')
+
+    properties = Element.properties + ('position', 'moving', 'locked', 'blocked')
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -749,7 +887,6 @@ class Turnout(Element):
         self.moving = False
         self.locked = False
         self.blocked = False
-        self.properties += ['position', 'moving', 'locked', 'blocked']
         self.moving_delay = 6
         self.task = None
 
@@ -793,18 +930,23 @@ class Turnout(Element):
         """Start the motion and wait for it to complete."""
         if position == self.position:
             return
-        self.position = position
-        self.update(moving=True)
-
-        # TODO: instead of this timeout, we need to wait for the trackside
-        # element to confirm reaching the final position.
-        await asyncio.sleep(self.moving_delay)
-        self.update(moving=False)
+        self.update(position=position, moving=True)
+        try:
+            # TODO: instead of this timeout, we need to wait for the trackside
+            # element to confirm reaching the final position.
+            await asyncio.sleep(self.moving_delay)
+        finally:
+            # also runs when a new change cancels this one
+            self.update(moving=False)
 
 
 class OuterButton(Element):
     """Records an outer button."""
 
+    __slots__ = ('counter',)
+
+    properties = ()
+
     objects = ElementManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -819,7 +961,6 @@ class OuterButton(Element):
             panel.
         """
         super().__init__(tower, name)
-        self.properties = []
         self.counter = None
 
     def add_counter(self):
@@ -848,11 +989,53 @@ class OuterButton(Element):
 class RouteManager(ElementManager):
     """
     An object manager for :py:class:`Route` objects.
+
+    Routes are also indexed by their start signal, see
+    :py:meth:`RouteManager.find_by_start`.
     """
+    def __init__(self):
+        super().__init__()
+        self.by_start = {}
+
+    def register(self, element):
+        """Register a route with this manager.
+
+        :param element: The route to be registered."""
+        previous = self.objects.get(element.name)
+        if previous is not None:
+            self.by_start[previous.s1].remove(previous)
+        super().register(element)
+        self.by_start.setdefault(element.s1, []).append(element)
+
+    def unregister(self, element):
+        """Remove a route from the manager.
+
+        :param element: the route to be unregistered, or its name.
+        """
+        route = self.get(element)
+        if route is not None:
+            super().unregister(route)
+            self.by_start[route.s1].remove(route)
+
+    def find_by_start(self, signal):
+        """Return all routes starting at a signal.
+
+        :param signal: The signal at the start of the routes.
+        :return: list of routes, which may be empty.
+        """
+        return self.by_start.get(signal, [])
+
     def find_by_signals(self, signals):
-        r = self.objects.get(f'{signals[0].name},{signals[1].name}')
+        """Return the route between two signals, in either direction.
+
+        :param signals: a collection of exactly two signals, such as
+            :py:attr:`ElementManager.pushed`.
+        :return: The route or ``None``.
+        """
+        s1, s2 = signals
+        r = self.objects.get(f'{s1.name},{s2.name}')
         if not r:
-            r = self.objects.get(f'{signals[1].name},{signals[0].name}')
+            r = self.objects.get(f'{s2.name},{s1.name}')
         return r
 
 
@@ -862,6 +1045,10 @@ class Route():
     A route connects a starting signal to a destination signal, and locks any intermediate turnouts and switches.
     """
 
+    __slots__ = (
+        's1', 's2', 'name', 'locked', 'tracks', 'turnouts', 'flankProtections', '_all_turnouts', 'tower',
+        'step_delay')
+
     objects = RouteManager()
     """The object manager for these elements. See :py:class:`ElementManager`."""
 
@@ -880,6 +1067,7 @@ class Route():
         self.tracks = []
         self.turnouts = []
         self.flankProtections = []
+        self._all_turnouts = None
         self.tower = tower
         self.objects.register(self)
         self.step_delay = 0.2
@@ -905,6 +1093,7 @@ class Route():
         """
         turnout = Turnout.objects.get(turnout)
         self.turnouts.append((turnout, position))
+        self._all_turnouts = None
         self.tracks.append(turnout)
         return self
 
@@ -918,8 +1107,19 @@ class Route():
         """
         turnout = Turnout.objects.get(turnout)
         self.flankProtections.append((turnout, position))
+        self._all_turnouts = None
         return self
 
+    @property
+    def all_turnouts(self):
+        """All turnouts of this route, followed by all flank protections.
+
+        :return: tuple of (turnout, position) pairs.
+        """
+        if self._all_turnouts is None:
+            self._all_turnouts = tuple(self.turnouts + self.flankProtections)
+        return self._all_turnouts
+
     def add_track(self, track):
         """Add a track.
 
@@ -942,7 +1142,7 @@ class Route():
 
     def start(self):
         """Start locking the route."""
-        logger.debug(f'started: {self}')
+        logger.debug('started: %s', self)
         return asyncio.create_task(self.change())
 
     async def change(self):
@@ -962,32 +1162,34 @@ class Route():
 
         6. Set start signal to go aspect.
         """
+        all_turnouts = self.all_turnouts
+        step_delay = self.step_delay
         tasks = []
-        for (turnout, position) in self.turnouts + self.flankProtections:
+        for (turnout, position) in all_turnouts:
             if turnout.locked:
-                logger.debug(f'Turnout {turnout} is already locked, not activating route {self}')
+                logger.debug('Turnout %s is already locked, not activating route %s', turnout, self)
                 return
             if turnout.occupied:
-                logger.debug(f'Turnout {turnout} is occupied, not activating route {self}')
+                logger.debug('Turnout %s is occupied, not activating route %s', turnout, self)
                 return
-        for (turnout, position) in self.turnouts + self.flankProtections:
+        for (turnout, position) in all_turnouts:
             tasks.append(turnout.start_change(position))
-            await asyncio.sleep(self.step_delay)
-        await asyncio.wait(tasks)
-        for (turnout, position) in self.turnouts + self.flankProtections:
-            if turnout.occupied:
-                logger.debug(f'Turnout {turnout} is occupied, not activating route {self}')
-                return
-        for (turnout, position) in self.turnouts + self.flankProtections:
+            await asyncio.sleep(step_delay)
+        await asyncio.gather(*tasks)
+        occupied = next((turnout for (turnout, position) in all_turnouts if turnout.occupied), None)
+        if occupied is not None:
+            logger.debug('Turnout %s is occupied, not activating route %s', occupied, self)
+            return
+        for (turnout, position) in all_turnouts:
             turnout.update(locked=1)
-            await asyncio.sleep(self.step_delay)
-        for track in self.tracks:
-            if track.occupied:
-                logger.debug(f'Track {track} is occupied, not activating route {self}')
-                return
+            await asyncio.sleep(step_delay)
+        occupied = next((track for track in self.tracks if track.occupied), None)
+        if occupied is not None:
+            logger.debug('Track %s is occupied, not activating route %s', occupied, self)
+            return
         for track in self.tracks:
             track.update(locked=1)
-            await asyncio.sleep(self.step_delay)
+            await asyncio.sleep(step_delay)
         self.s1.start_home('Hp1')
         self.locked = True
 
@@ -997,7 +1199,7 @@ class Route():
         If the route is locked, remove locks from turnouts and tracks.
         """
         self.s1.start_home('Hp0')
-        for (turnout, position) in self.turnouts + self.flankProtections:
+        for (turnout, position) in self.all_turnouts:
             turnout.update(locked=0)
         for track in self.tracks:
             track.update(locked=0)
@@ -1028,8 +1230,15 @@ class Tower():
             self.client = MQTTClient()
         else:
             self.client = client
-        self.dispatcher = MQTTDispatcher(self.client)
+        self.dispatcher = MQTTDispatcher(
+            self.client, [f'frischen/{name}/panel/button/#', f'frischen/{name}/trackside/#'])
         self.connected = False
+        self.outbox = None
+        """Queue of messages waiting to be published, see :py:meth:`Tower.publish_outbox`."""
+        self.publish_delay = 0
+        """Seconds to wait after the first queued message, so more can be sent in the same batch."""
+        self.publish_max_batch = None
+        """Maximum number of messages sent in one batch, or ``None`` for no limit."""
         self.name = name
         self.managers = [BlockEnd, BlockStart, Counter, DistantSignal, OuterButton, Route, Signal, Track, Turnout]
 
@@ -1042,8 +1251,6 @@ class Tower():
         OuterButton(self, 'WGT')
         OuterButton(self, 'WHT').add_counter()
 
-        logger.setLevel(logging.DEBUG)
-
     def reset_all(self):
         """Reset all managed elements."""
 
@@ -1053,21 +1260,51 @@ class Tower():
     def is_outer_button(self, button):
         """Return true only if this outer button is pushed, but no other."""
 
-        buttons = OuterButton.objects.entries()
-        if not buttons[button].pushed:
-            return False
-        for b in buttons.values():
-            if b.pushed and b.name != button:
-                return False
-        return True
+        pushed = OuterButton.objects.pushed
+        return len(pushed) == 1 and OuterButton.objects.get(button) in pushed
 
     def publish(self, topic, value):
-        """Publish a message and don't wait, "fire and forget" style."""
+        """Publish a message and don't wait, "fire and forget" style.
+
+        The message is queued in the outbox and sent by
+        :py:meth:`Tower.publish_outbox`.
+        """
 
         if not self.connected:
             return
-        logger.debug(f'Publishing {topic} = {value.decode("utf-8")}')
-        return asyncio.create_task(self.client.publish(topic, value))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Publishing %s = %s', topic, value.decode('utf-8'))
+        self.outbox.put_nowait((topic, value))
+
+    async def publish_outbox(self):
+        """Publish queued messages until cancelled.
+
+        All messages waiting in the outbox are sent as one batch, at QoS 0.
+        If a topic has been queued more than once, only its latest value is
+        sent. :py:attr:`publish_delay` and :py:attr:`publish_max_batch` tune
+        how many messages are collected into a batch.
+        """
+        while True:
+            topic, value = await self.outbox.get()
+            batch = {topic: value}
+            count = 1
+            if self.publish_delay:
+                await asyncio.sleep(self.publish_delay)
+            max_batch = self.publish_max_batch
+            while not self.outbox.empty() and (max_batch is None or count < max_batch):
+                topic, value = self.outbox.get_nowait()
+                batch.pop(topic, None)
+                batch[topic] = value
+                count += 1
+            try:
+                results = await asyncio.gather(
+                    *(self.client.publish(t, v, qos=QOS_0) for t, v in batch.items()), return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error('Unable to publish: %s', result)
+            finally:
+                for _ in range(count):
+                    self.outbox.task_done()
 
     def panel_topic(self, kind, subject):
         """Return the full topic for a panel element."""
@@ -1082,7 +1319,11 @@ class Tower():
     async def run(self):
         """Connect to the broker and act on messages received."""
         await self.client.connect('mqtt://localhost/')
+        self.outbox = asyncio.Queue()
+        publisher = asyncio.create_task(self.publish_outbox())
         self.connected = True
         self.reset_all()
         await self.dispatcher.dispatch()
+        await self.outbox.join()
+        publisher.cancel()
         await self.client.disconnect()
@@ -4,45 +4,111 @@
 import asyncio
 import unittest
 
-from unittest.mock import call, create_autospec, MagicMock, Mock, patch
+from functools import lru_cache
 
-from hbmqtt.client import MQTTClient
+from unittest.mock import call, MagicMock, patch
 
 from frischen.spdrl20 import (
-    BlockEnd, BlockStart, Counter, DistantSignal, Element, MQTTDispatcher, OuterButton, Route, Signal, Tower,
-    Track, Turnout)
+    array_to_str, BlockEnd, BlockStart, Counter, DistantSignal, Element, MQTTDispatcher, OuterButton, Route, Signal,
+    Tower, Track, Turnout)
 
 
-def get_async_mock(return_value):
-    """Returns a mock object that wraps an async method."""
-    async def async_mock(*args, **kwargs):
-        return return_value
+class RecordingPublish():
+    """Records calls to Tower.publish().
 
-    return Mock(wraps=async_mock)
+    Implements the subset of the mock assertions used by these tests, without
+    the overhead of a MagicMock.
+    """
+    __slots__ = ('calls',)
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, topic, value):
+        self.calls.append(call(topic, value))
+
+    @property
+    def called(self):
+        return len(self.calls) > 0
+
+    def assert_called_once_with(self, topic, value):
+        if self.calls != [call(topic, value)]:
+            raise AssertionError(f'Expected one call {call(topic, value)}, got {self.calls}')
+
+    def assert_called_with(self, topic, value):
+        if not self.calls or self.calls[-1] != call(topic, value):
+            raise AssertionError(f'Expected last call {call(topic, value)}, got {self.calls}')
+
+    def assert_has_calls(self, calls):
+        n = len(calls)
+        if not any(self.calls[i:i + n] == calls for i in range(len(self.calls) - n + 1)):
+            raise AssertionError(f'Calls {calls} not found in {self.calls}')
+
+
+@lru_cache(maxsize=None)
+def panel_topic(kind, subject):
+    return f'panel/{kind}/{subject}'
+
+
+@lru_cache(maxsize=None)
+def trackside_topic(kind, subject):
+    return f'trackside/{kind}/{subject}'
+
+
+class FakeMQTTClient():
+    """Stands in for hbmqtt.client.MQTTClient, recording published messages."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def connect(self, *args, **kwargs):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def publish(self, topic, message, **kwargs):
+        self.calls.append((topic, message))
 
 
 def get_tower_mock():
     tower = MagicMock()
     tower.elements = {}
-    tower.publish = MagicMock()
-    tower.panel_topic = lambda k, v: f'panel/{k}/{v}'
-    tower.trackside_topic = lambda k, v: f'trackside/{k}/{v}'
+    tower.publish = RecordingPublish()
+    tower.panel_topic = panel_topic
+    tower.trackside_topic = trackside_topic
     tower.dispatcher = MQTTDispatcher(tower)
     tower.is_outer_button = MagicMock(return_value=False)
     return tower
 
 
+class ArrayToStrTestCase(unittest.TestCase):
+    def test_array_to_str(self):
+        self.assertEqual(array_to_str([]), '')
+        self.assertEqual(array_to_str([True, False, 1, 0, 'Hp0', 12]), '1,0,1,0,Hp0,12')
+
+
 class ElementTestCase(unittest.TestCase):
     def setUp(self):
         self.tower = get_tower_mock()
         self.uat = Element(self.tower, 'uat')
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_manager(self):
         self.assertIn(self.uat, Element.objects.all())
         self.assertEqual(Element.objects.get('uat'), self.uat)
         self.assertIsNone(Element.objects.get('other'))
+        self.assertEqual(Element.objects.get(self.uat), self.uat)
+        self.assertIsNone(Element.objects.get(Track(self.tower, 'uat')), 'object is not registered')
+
+    def test_unregister(self):
+        Element.objects.unregister('uat')
+        self.assertIsNone(Element.objects.get('uat'))
+        Element.objects.register(self.uat)
+        Element.objects.unregister(self.uat)
+        self.assertIsNone(Element.objects.get('uat'))
+        Element.objects.unregister(self.uat)
 
     def test_init(self):
         Element.objects.reset_all()
@@ -56,9 +122,19 @@ class ElementTestCase(unittest.TestCase):
         self.uat.occupied = 0
         self.assertEqual(self.uat.value, '0', 'changed after property=0')
 
+    def test_update_unchanged(self):
+        self.uat.update(occupied=False)
+        self.assertFalse(self.tower.publish.called, 'unchanged state is not published again')
+
     def test_invalid_property(self):
         with self.assertRaises(KeyError) as c:
             self.uat.update(invalid='foo')
+        with self.assertRaises(KeyError):
+            self.uat.update(name='foo')
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.uat.invalid = 'foo'
 
 
 class BlockEndTestCase(unittest.TestCase):
@@ -69,7 +145,7 @@ class BlockEndTestCase(unittest.TestCase):
         self.uat = BlockEnd(self.tower, 'uat', blockstart_topic=self.block_start_topic,
                             clearance_lock_release_topic=self.clearance_lock_release_topic)
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertNotEqual(Element.objects, BlockEnd.objects)
@@ -77,29 +153,32 @@ class BlockEndTestCase(unittest.TestCase):
         self.uat.reset()
         self.tower.publish.assert_called_once_with('panel/blockend/uat', b'0,0,1')
 
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.uat.update(occupied=True)
         self.tower.publish.assert_called_once_with('panel/blockend/uat', b'1,0,1')
 
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.uat.update(blocked=True)
         self.tower.publish.assert_called_once_with('panel/blockend/uat', b'1,1,1')
 
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.uat.update(clearance_lock=False)
         self.tower.publish.assert_called_once_with('panel/blockend/uat', b'1,1,0')
 
     def test_on_button_alone(self):
-        self.tower.dispatcher.dispatch_one(self.tower.trackside_topic('block', self.block_start_topic), '1')
-        self.tower.dispatcher.dispatch_one(self.tower.trackside_topic('track', self.clearance_lock_release_topic), '0')
-
-        self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
+        self.tower.dispatcher.dispatch_many([
+            (self.tower.trackside_topic('block', self.block_start_topic), '1'),
+            (self.tower.trackside_topic('track', self.clearance_lock_release_topic), '0'),
+            (self.tower.panel_topic('button', 'uat'), '1'),
+        ])
         self.assertEqual(self.uat.blocked, True, 'is still blocked')
         self.assertEqual(self.uat.clearance_lock, False, 'clearance is still unlocked')
 
     def test_on_button_with_blockgroupbutton_clearance_lock(self):
-        self.tower.dispatcher.dispatch_one(self.tower.trackside_topic('block', self.block_start_topic), '1')
-        self.tower.dispatcher.dispatch_one(self.tower.trackside_topic('track', self.clearance_lock_release_topic), '1')
+        self.tower.dispatcher.dispatch_many([
+            (self.tower.trackside_topic('block', self.block_start_topic), '1'),
+            (self.tower.trackside_topic('track', self.clearance_lock_release_topic), '1'),
+        ])
         self.tower.is_outer_button = MagicMock(return_value=True)
 
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
@@ -107,8 +186,10 @@ class BlockEndTestCase(unittest.TestCase):
         self.assertEqual(self.uat.clearance_lock, True, 'clearance is still locked')
 
     def test_on_button_with_blockgroupbutton(self):
-        self.tower.dispatcher.dispatch_one(self.block_start_topic, '1')
-        self.tower.dispatcher.dispatch_one(self.clearance_lock_release_topic, '0')
+        self.tower.dispatcher.dispatch_many([
+            (self.block_start_topic, '1'),
+            (self.clearance_lock_release_topic, '0'),
+        ])
         self.tower.is_outer_button = MagicMock(return_value=True)
 
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
@@ -124,18 +205,18 @@ class BlockStartTestCase(unittest.TestCase):
         self.uat = BlockStart(self.tower, 'uat', blockend_topic=self.blockend_topic,
                               blocking_track_topic=self.blocking_track_topic)
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, BlockStart.objects.all())
         self.uat.reset()
         self.tower.publish.assert_called_once_with('panel/blockstart/uat', b'0,0')
 
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.uat.update(occupied=True)
         self.tower.publish.assert_called_once_with('panel/blockstart/uat', b'1,0')
 
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.uat.update(blocked=True)
         self.tower.publish.assert_called_once_with('panel/blockstart/uat', b'1,1')
 
@@ -148,7 +229,8 @@ class BlockStartTestCase(unittest.TestCase):
         self.tower.publish.assert_has_calls(calls)
 
     def test_unblocking(self):
-        self.uat.blocked = True
+        self.uat.update(blocked=True)
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.trackside_topic('block', self.blockend_topic), '0')
         self.tower.publish.assert_called_once_with('panel/blockstart/uat', b'0,0')
 
@@ -159,7 +241,7 @@ class CounterTestCase(unittest.TestCase):
         self.button = OuterButton(self.tower, 'uat').add_counter()
         self.uat = self.button.counter
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, Counter.objects.all())
@@ -177,11 +259,12 @@ class DistantSignalTestCase(unittest.TestCase):
         self.home = Signal(self.tower, 'H').add_home()
         self.uat = DistantSignal(self.tower, 'uat', 'H')
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, DistantSignal.objects.all())
         self.assertIn(f'{self.uat}', [name for (name, _) in self.home.on_update.subscribers])
+        self.assertEqual(self.uat.topic(), 'panel/signal/uat')
         self.uat.reset()
         self.tower.publish.assert_called_once_with('panel/signal/uat', b'Vr0')
 
@@ -205,7 +288,7 @@ class DistantSignalMountedAtTestCase(unittest.TestCase):
         self.uat.reset()
         self.home.reset()
         self.mounted_at.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, DistantSignal.objects.all())
@@ -243,7 +326,7 @@ class DistantSignalWithDivergingRouteTestCase(unittest.TestCase):
         self.home2 = Signal(self.tower, 'H2').add_home()
         self.uat = DistantSignal(self.tower, 'uat', {'W1': ['H1', 'H2']})
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, DistantSignal.objects.all())
@@ -252,37 +335,67 @@ class DistantSignalWithDivergingRouteTestCase(unittest.TestCase):
         self.uat.reset()
         self.tower.publish.assert_called_once_with('panel/signal/uat', b'Vr0')
 
-    def test_proceed_straight(self):
-        self.turnout.position = False
-        self.home1.start_home('Hp1')
-        calls = [call('panel/signal/H1', b'Hp1'), call('panel/signal/uat', b'Vr1')]
-        self.tower.publish.assert_has_calls(calls)
-
-    def test_stop_straight(self):
-        self.turnout.position = False
-        self.home1.aspect = 'Hp1'
-        self.home1.start_halt()
-        calls = [call('panel/signal/H1', b'Hp0'), call('panel/signal/uat', b'Vr0')]
-        self.tower.publish.assert_has_calls(calls)
-
-    def test_proceed_diverging_other_signal(self):
-        self.turnout.position = True
-        self.home1.start_home('Hp1')
-        calls = [call('panel/signal/H1', b'Hp1')]
-        self.tower.publish.assert_has_calls(calls)
+    def reset(self, position):
+        self.turnout.position = position
+        self.home1.update(aspect='Hp0')
+        self.home2.update(aspect='Hp0')
+        self.uat.update(aspect='Vr0')
+        self.tower.publish = RecordingPublish()
 
-    def test_proceed_diverging(self):
-        self.turnout.position = True
-        self.home2.start_home('Hp1')
-        calls = [call('panel/signal/H2', b'Hp1'), call('panel/signal/uat', b'Vr1')]
-        self.tower.publish.assert_has_calls(calls)
-
-    def test_stop_diverging(self):
-        self.turnout.position = True
-        self.home2.aspect = 'Hp1'
-        self.home2.start_halt()
-        calls = [call('panel/signal/H2', b'Hp0'), call('panel/signal/uat', b'Vr0')]
-        self.tower.publish.assert_has_calls(calls)
+    def test_proceed(self):
+        cases = [
+            (False, self.home1, [call('panel/signal/H1', b'Hp1'), call('panel/signal/uat', b'Vr1')]),
+            (True, self.home1, [call('panel/signal/H1', b'Hp1')]),
+            (True, self.home2, [call('panel/signal/H2', b'Hp1'), call('panel/signal/uat', b'Vr1')]),
+        ]
+        for position, home, calls in cases:
+            with self.subTest(position=position, home=home):
+                self.reset(position)
+                home.start_home('Hp1')
+                self.tower.publish.assert_has_calls(calls)
+
+    def test_stop(self):
+        cases = [
+            (False, self.home1, [call('panel/signal/H1', b'Hp0'), call('panel/signal/uat', b'Vr0')]),
+            (True, self.home2, [call('panel/signal/H2', b'Hp0'), call('panel/signal/uat', b'Vr0')]),
+        ]
+        for position, home, calls in cases:
+            with self.subTest(position=position, home=home):
+                self.reset(position)
+                home.update(aspect='Hp1')
+                home.start_halt()
+                self.tower.publish.assert_has_calls(calls)
+
+
+class MQTTDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.uat = MQTTDispatcher(None, ['a/b/#'])
+        self.fn = MagicMock()
+
+    def test_dispatch_one(self):
+        self.uat.subscribe('a/b/c', 'fn', self.fn)
+        self.uat.dispatch_one('a/b/c', '1')
+        self.uat.dispatch_one('a/b/d', '1')
+        self.fn.assert_called_once_with('a/b/c', '1')
+
+    def test_dispatch_one_multiple_subscribers(self):
+        other = MagicMock()
+        self.uat.subscribe('a/b/c', 'fn', self.fn)
+        self.uat.subscribe('a/b/c', 'other', other)
+        self.uat.dispatch_one('a/b/c', '1')
+        self.fn.assert_called_once_with('a/b/c', '1')
+        other.assert_called_once_with('a/b/c', '1')
+
+    def test_dispatch_many(self):
+        self.uat.subscribe('a/b/c', 'fn', self.fn)
+        self.uat.dispatch_many([('a/b/c', '1'), ('a/b/d', '2'), ('a/b/c', '3')])
+        self.assertEqual(self.fn.call_args_list, [call('a/b/c', '1'), call('a/b/c', '3')])
+
+    def test_subscriptions(self):
+        self.uat.subscribe('a/b/c', 'fn', self.fn)
+        self.uat.subscribe('a/bc', 'fn', self.fn)
+        self.uat.subscribe('x/y', 'fn', self.fn)
+        self.assertEqual(self.uat.subscriptions(), ['a/b/#', 'a/bc', 'x/y'])
 
 
 class OuterButtonTestCase(unittest.TestCase):
@@ -290,7 +403,7 @@ class OuterButtonTestCase(unittest.TestCase):
         self.tower = get_tower_mock()
         self.uat = OuterButton(self.tower, 'uat')
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_manager(self):
         self.assertIn(self.uat, OuterButton.objects.all())
@@ -311,13 +424,13 @@ class OuterButtonTestCase(unittest.TestCase):
             self.uat.update(invalid='foo')
 
 
-class RouteTestCase(unittest.TestCase):
+class RouteTestCase(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.tower = get_tower_mock()
         self.s1 = Signal(self.tower, 's1')
         self.s2 = Signal(self.tower, 's2')
         self.uat = Route(self.tower, self.s1, self.s2, 'release_topic')
-        self.uat.step_delay = 0.001
+        self.uat.step_delay = 0
         self.turnout = Turnout(self.tower, 'w1')
         self.flank_protection = Turnout(self.tower, 'w2')
         self.track = Track(self.tower, '1-1')
@@ -330,8 +443,11 @@ class RouteTestCase(unittest.TestCase):
 
     def test_init(self):
         self.assertIn(self.uat, Route.objects.all())
+        self.assertIn(self.uat, Route.objects.find_by_start(self.s1))
+        self.assertNotIn(self.uat, Route.objects.find_by_start(self.s2))
+        self.assertEqual(self.uat.all_turnouts, ((self.turnout, False), (self.flank_protection, False)))
 
-    async def async_start_route(self):
+    async def test_start_route(self):
         """Full route lock is established on the route and all elements.
         """
         await self.uat.start()
@@ -340,8 +456,26 @@ class RouteTestCase(unittest.TestCase):
         self.assertTrue(self.flank_protection.locked)
         self.assertTrue(self.track.locked)
 
-    def test_start_route(self):
-        asyncio.get_event_loop().run_until_complete(self.async_start_route())
+    async def test_start_route_track_occupied(self):
+        """No route lock is established if a track is occupied."""
+        self.track.occupied = True
+        await self.uat.start()
+        self.assertFalse(self.uat.locked)
+        self.assertFalse(self.track.locked)
+
+    async def test_start_route_without_turnouts(self):
+        """A route consisting of tracks only can be locked."""
+        route = Route(self.tower, self.s2, self.s1, 'release_topic')
+        route.step_delay = 0
+        route.add_track(self.track.name)
+        await route.start()
+        self.assertTrue(route.locked)
+        self.assertTrue(self.track.locked)
+
+    def test_unregister(self):
+        Route.objects.unregister(self.uat)
+        self.assertNotIn(self.uat, Route.objects.all())
+        self.assertNotIn(self.uat, Route.objects.find_by_start(self.s1))
 
     def test_unlock(self):
         self.uat.locked = True
@@ -355,7 +489,7 @@ class RouteTestCase(unittest.TestCase):
         self.assertFalse(self.track.locked)
 
 
-class SignalTestCase(unittest.TestCase):
+class SignalTestCase(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.tower = get_tower_mock()
         self.uat = Signal(self.tower, 'uat')
@@ -366,7 +500,7 @@ class SignalTestCase(unittest.TestCase):
         # self.route.start = MagicMock()
         # self.route.unlock = MagicMock()
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, Signal.objects.all())
@@ -375,65 +509,62 @@ class SignalTestCase(unittest.TestCase):
 
     def test_shunting_no_shunting_aspect(self):
         self.tower.is_outer_button = lambda b: b=='SGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertFalse(self.tower.publish.called)
 
     def test_shunting_no_outer_button(self):
         self.uat.add_shunting()
         self.tower.is_outer_button = lambda b: False
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertFalse(self.tower.publish.called)
 
     def test_shunting_shunting_aspect(self):
         self.uat.add_shunting()
         self.tower.is_outer_button = lambda b: b=='SGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.tower.publish.assert_called_once_with('panel/signal/uat', b'Sh1')
 
     def test_set_to_stop_from_sh1(self):
-        self.uat.aspect = 'Sh1'
+        self.uat.update(aspect='Sh1')
         self.tower.is_outer_button = lambda b: b=='HaGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.tower.publish.assert_called_once_with('panel/signal/uat', b'Hp0')
 
     def test_set_to_stop_from_hp1(self):
-        self.uat.aspect = 'Hp1'
+        self.uat.update(aspect='Hp1')
         self.tower.is_outer_button = lambda b: b=='HaGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.tower.publish.assert_called_once_with('panel/signal/uat', b'Hp0')
 
     def test_alt_no_alt_aspect(self):
         self.tower.is_outer_button = lambda b: b=='ErsGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertFalse(self.tower.publish.called)
 
     def test_alt_no_outer_button(self):
         self.uat.add_alt()
         self.tower.is_outer_button = lambda b: False
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertFalse(self.tower.publish.called)
 
-    async def async_alt_alt_aspect(self):
+    async def test_alt_alt_aspect(self):
         self.uat.add_alt()
-        self.uat.alt_delay = 0.001
+        self.uat.alt_delay = 0
         self.tower.is_outer_button = lambda b: b=='ErsGT'
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertIsNotNone(self.uat.task, 'alt aspect is started')
         await self.uat.task
         calls = [call('panel/signal/uat', b'Zs1'), call('panel/signal/uat', b'Hp0')]
         self.tower.publish.assert_has_calls(calls)
 
-    def test_alt_alt_aspect(self):
-        asyncio.get_event_loop().run_until_complete(self.async_alt_alt_aspect())
-
     def test_route_release(self):
         self.uat.aspect = 'Hp1'
         self.route.locked = True
@@ -442,18 +573,35 @@ class SignalTestCase(unittest.TestCase):
             self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
             fn.assert_called_once_with()
 
+    def test_pushed(self):
+        self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
+        self.assertEqual(Signal.objects.pushed, {self.uat})
+        self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '0')
+        self.assertEqual(Signal.objects.pushed, set())
+
     def test_route_start(self):
         self.tower.is_outer_button = lambda b: False
         with patch.object(Route, 'start') as fn:
-            self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 's2'), '1')
-            self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
+            self.tower.dispatcher.dispatch_many([
+                (self.tower.panel_topic('button', 's2'), '1'),
+                (self.tower.panel_topic('button', 'uat'), '1'),
+            ])
             fn.assert_called_once_with()
 
+    def test_route_start_released(self):
+        self.tower.is_outer_button = lambda b: False
+        with patch.object(Route, 'start') as fn:
+            self.tower.dispatcher.dispatch_many([
+                (self.tower.panel_topic('button', 's2'), '1'),
+                (self.tower.panel_topic('button', 's2'), '0'),
+                (self.tower.panel_topic('button', 'uat'), '1'),
+            ])
+            self.assertFalse(fn.called, 'no route without both signal buttons pushed')
 
-class TowerTestCase(unittest.TestCase):
+
+class TowerTestCase(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.client = create_autospec(MQTTClient)
-        self.client.publish = get_async_mock(None)
+        self.client = FakeMQTTClient()
         self.uat = Tower('uat', self.client)
 
     def test_init(self):
@@ -481,14 +629,37 @@ class TowerTestCase(unittest.TestCase):
         b.pushed = True
         self.assertFalse(self.uat.is_outer_button('WGT'))
 
-    async def async_publish(self):
-        """Calling publish on the tower calls MQTTClient.publish()."""
+    def test_is_outer_button_released(self):
+        """An outer button has been pushed and released again."""
+        b = OuterButton.objects.get('WGT')
+        b.pushed = True
+        b.pushed = False
+        self.assertFalse(self.uat.is_outer_button('WGT'))
+
+    async def publish_all(self, messages):
+        self.uat.outbox = asyncio.Queue()
         self.uat.connected = True
-        await self.uat.publish('topic', b'value')
-        self.client.publish.assert_called_once_with('topic', b'value')
+        publisher = asyncio.create_task(self.uat.publish_outbox())
+        for topic, value in messages:
+            self.uat.publish(topic, value)
+        await self.uat.outbox.join()
+        publisher.cancel()
 
-    def test_publish(self):
-        asyncio.get_event_loop().run_until_complete(self.async_publish())
+    async def test_publish(self):
+        """Calling publish on the tower calls MQTTClient.publish()."""
+        await self.publish_all([('topic', b'value')])
+        self.assertEqual(self.client.calls, [('topic', b'value')])
+
+    async def test_publish_batch(self):
+        """Only the latest value queued for a topic is published."""
+        await self.publish_all([('topic', b'1'), ('other', b'2'), ('topic', b'3')])
+        self.assertEqual(self.client.calls, [('other', b'2'), ('topic', b'3')])
+
+    async def test_publish_max_batch(self):
+        """Batches are limited to publish_max_batch messages."""
+        self.uat.publish_max_batch = 1
+        await self.publish_all([('topic', b'1'), ('other', b'2'), ('topic', b'3')])
+        self.assertEqual(self.client.calls, [('topic', b'1'), ('other', b'2'), ('topic', b'3')])
 
 
 class TrackTestCase(unittest.TestCase):
@@ -496,7 +667,7 @@ class TrackTestCase(unittest.TestCase):
         self.tower = get_tower_mock()
         self.uat = Track(self.tower, 'uat')
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, Track.objects.all())
@@ -507,17 +678,22 @@ class TrackTestCase(unittest.TestCase):
         self.uat.update(occupied=1)
         self.tower.publish.assert_called_once_with('panel/track/uat', b'1,0')
 
+    def test_occupied_before_reset(self):
+        uat = Track(self.tower, 'fresh')
+        uat.update(occupied=True)
+        self.tower.publish.assert_called_once_with('panel/track/fresh', b'1,0')
+
     def test_locked(self):
         self.uat.update(locked=1)
         self.tower.publish.assert_called_once_with('panel/track/uat', b'0,1')
 
 
-class TurnoutTestCase(unittest.TestCase):
+class TurnoutTestCase(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.tower = get_tower_mock()
         self.uat = Turnout(self.tower, 'uat')
         self.uat.reset()
-        self.tower.publish.reset_mock()
+        self.tower.publish = RecordingPublish()
 
     def test_init(self):
         self.assertIn(self.uat, Turnout.objects.all())
@@ -527,8 +703,8 @@ class TurnoutTestCase(unittest.TestCase):
     def test_change_button_alone(self):
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
 
-    async def async_change_with_outer_button(self):
-        self.uat.moving_delay = 0.001
+    async def test_change_with_outer_button(self):
+        self.uat.moving_delay = 0
         self.tower.is_outer_button = lambda b: b=='WGT'
         self.tower.dispatcher.dispatch_one(self.tower.panel_topic('button', 'uat'), '1')
         self.assertIsNotNone(self.uat.task, 'change task is running')
@@ -536,8 +712,16 @@ class TurnoutTestCase(unittest.TestCase):
         calls = [call('panel/turnout/uat', b'0,1,1,0,0'), call('panel/turnout/uat', b'0,1,0,0,0')]
         self.tower.publish.assert_has_calls(calls)
 
-    def test_change_with_outer_button(self):
-        asyncio.get_event_loop().run_until_complete(self.async_change_with_outer_button())
+    async def test_change_cancelled(self):
+        self.uat.moving_delay = 10
+        task = self.uat.start_change()
+        await asyncio.sleep(0)
+        self.assertTrue(self.uat.moving, 'turnout is moving')
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(self.uat.moving, 'turnout is no longer moving')
+        self.tower.publish.assert_called_with('panel/turnout/uat', b'0,1,0,0,0')
 
     def test_change_locked(self):
         self.tower.is_outer_button = lambda b: b=='WGT'
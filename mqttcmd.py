@@ -17,7 +17,8 @@ config = {
 
 
 def usage():
-    print('''Usage: {} [-h hostname] [-p port] [-T] command [param...]
+    name = os.path.basename(__file__)
+    print(f'''Usage: {name} [-h hostname] [-p port] [-T] command [param...]
 
 Commands:
     monitor topic...
@@ -30,7 +31,7 @@ Commands:
             frischen/adorf/#
     post topic message...
         Post one or more messages to the topic.
-'''.format(os.path.basename(__file__)), file=sys.stderr, end='')
+''', file=sys.stderr, end='')
     sys.exit(64)
 
 
@@ -38,7 +39,7 @@ def cmd_monitor(args):
     if len(args) < 1:
         print('You need to specify at least one topic.', file=sys.stderr)
         usage()
-    m = MqttMonitor('{}-{}'.format(config['client_id'], 'monitor'),
+    m = MqttMonitor(f"{config['client_id']}-monitor",
                     topics=args, host=config['host'], port=config['port'],
                     timestamp=config['timestamp'])
     m.monitor()
@@ -49,26 +50,32 @@ def cmd_post(args):
             print('must specify least the topic and one message',
                   file=sys.stderr)
             usage()
-        p = MqttPost('{}-{}'.format(config['client_id'], 'post'),
+        p = MqttPost(f"{config['client_id']}-post",
                      config['host'], config['port'])
         p.post(args[0], args[1:])
 
 
+commands = {
+    'monitor': cmd_monitor,
+    'post': cmd_post,
+}
+
+
 def main():
     global config
 
     try:
         options, args = getopt.getopt(
-            sys.argv[1:], 'h:p:T?', ['host', 'port', help])
+            sys.argv[1:], 'h:p:T?', ['host=', 'port=', 'no-timestamp', 'help'])
     except getopt.GetoptError as e:
-        print('Error parsing command line: {}'.format(e), file=sys.stderr)
+        print(f'Error parsing command line: {e}', file=sys.stderr)
         usage()
 
     for opt, arg in options:
         if opt in ('-h', '--host'):
             config['host'] = arg
         if opt in ('-p', '--port'):
-            config['port'] = arg
+            config['port'] = int(arg)
         if opt in ('-T', '--no-timestamp'):
             config['timestamp'] = False
         if opt in ('-?', '--help'):
@@ -79,12 +86,7 @@ def main():
         usage()
 
     cmd = args.pop(0)
-    if cmd == 'monitor':
-        cmd_monitor(args)
-    elif cmd == 'post':
-        cmd_post(args)
-    else:
-        usage()
+    commands.get(cmd, lambda args: usage())(args)
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import getopt
+import math
 import os
 import sys
 
@@ -19,8 +20,9 @@ config = {
 
 
 def usage():
-    print('''Usage: {} [-h hostname] [-p port] [-t topic]
-'''.format(os.path.basename(__file__)), file=sys.stderr, end='')
+    name = os.path.basename(__file__)
+    print(f'''Usage: {name} [-h hostname] [-p port] [-t topic]
+''', file=sys.stderr, end='')
     sys.exit(64)
 
 
@@ -29,32 +31,37 @@ def main():
 
     try:
         options, args = getopt.getopt(
-            sys.argv[1:], 'h:p:t:?', ['host', 'port', 'topic', help])
+            sys.argv[1:], 'h:p:t:?', ['host=', 'port=', 'topic=', 'help'])
     except getopt.GetoptError as e:
-        print('Error parsing command line: {}'.format(e), file=sys.stderr)
+        print(f'Error parsing command line: {e}', file=sys.stderr)
         usage()
 
     for opt, arg in options:
         if opt in ('-h', '--host'):
             config['host'] = arg
         if opt in ('-p', '--port'):
-            config['port'] = arg
+            config['port'] = int(arg)
         if opt in ('-t', '--topic'):
             config['topic'] = arg
         if opt in ('-?', '--help'):
             usage()
 
-    p = MqttPost('{}-{}'.format(config['client_id'], 'post'),
+    p = MqttPost(f"{config['client_id']}-post",
                  config['host'], config['port'])
-    i = 0
+    p.connect()
+    # publish 1 on every full second, and 0 on every half second
+    start = math.ceil(time())
+    tick = 0
     while True:
-        next = int(time()) + 1 - 0.5 * i
-        delay = next - time()
-        while delay > 0.0:
-            sleep(delay)
-            delay = next - time()
-        i = 1 if i == 0 else 0
-        p.post(config['topic'], [i])
+        delay = start + 0.5 * tick - time()
+        if delay < -0.5 or delay > 1.0:
+            # the clock has jumped; start over at the next full second
+            start = math.ceil(time())
+            tick = 0
+            delay = start - time()
+        sleep(max(0.0, delay))
+        p.client.publish(config['topic'], 1 - tick % 2, qos=0)
+        tick += 1
 
 
 if __name__ == "__main__":
@@ -5,6 +5,11 @@ import yaml
 
 from graphviz import Graph
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 element_types = {
     'connection': 'diamond',
@@ -15,42 +20,42 @@ element_types = {
 }
 
 
-def element_and_link_from_connect(connect):
-    return connect.rsplit('.', 2)
+def element_from_connect(connect):
+    return connect.partition('.')[0]
 
 
 def shape_for_element_type(type):
-    if type in element_types:
-        return element_types[type]
-    return 'box'
+    return element_types.get(type, 'box')
 
 
 with open('adorf-trackplan.yml') as f:
-    t = yaml.load(f)
+    t = yaml.load(f, Loader=SafeLoader)
 
 dot = Graph(comment=t['name'])
 dot.graph_attr['rankdir'] = 'LR'
 
+ranks = {'min': [], 'max': []}
 for k, v in t['elements'].items():
     shape = shape_for_element_type(v['type'])
     dot.node(k, v['name'], shape=shape)
+    rank = v.get('graphviz', {}).get('rank')
+    if rank:
+        for r, nodes in ranks.items():
+            if r in rank:
+                nodes.append(k)
 
-for rank in ['min', 'max']:
+for rank, nodes in ranks.items():
     with dot.subgraph() as s:
         s.attr(rank=rank)
-        for k, v in t['elements'].items():
-            if 'graphviz' in v:
-                if 'rank' in v['graphviz']:
-                    if rank in v['graphviz']['rank']:
-                        s.node(k)
+        for k in nodes:
+            s.node(k)
 
 for k, v in t['tracks'].items():
-    n0 = element_and_link_from_connect(v['connects'][0])
-    n1 = element_and_link_from_connect(v['connects'][1])
+    n0 = element_from_connect(v['connects'][0])
+    n1 = element_from_connect(v['connects'][1])
     length = abs(v['start'] - v['end'])
-    weight = str(int(10000.0 / length)) if length > 0 else '10000'
-    print('{} -> {} ({})'.format(n0[0], n1[0], weight))
-    dot.edge(n0[0], n1[0], label=k, weight=weight)
+    weight = str(int(10000 // length)) if length > 0 else '10000'
+    dot.edge(n0, n1, label=k, weight=weight)
 
 print(dot.source)
 dot.render('adorf-trackplan.gv', view=True)